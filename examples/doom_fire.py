@@ -3,15 +3,17 @@
 DOOM Fire Effect — running inside Dragonfly via Lua scripting.
 
 The entire fire physics simulation runs as a Lua script inside Dragonfly.
-This client just sends EVAL and renders the result. The database IS the game engine.
+This client just sends EVALSHA and renders the result. The database IS the game engine.
 
 Usage:
-    pip install redis
+    pip install "redis[hiredis]"
     # Start Dragonfly first, then:
     python3 examples/doom_fire.py
 """
 
 import os
+import random
+import struct
 import sys
 import time
 
@@ -58,63 +60,111 @@ PALETTE = [
     (0xFF, 0xFF, 0xFF),
 ]
 
+# Pre-encoded true-color cell for every possible byte value.
+# Intensities past the end of the palette clamp to its last color.
+CELL = tuple(f"\033[48;2;{r};{g};{b}m ".encode() for r, g, b in PALETTE)
+CELL += CELL[-1:] * (256 - len(CELL))
+
 # All fire physics run inside Dragonfly as a Lua script.
 # The grid is a binary string: each byte = pixel intensity (0..36).
 # Bottom row = max fire. Each frame, fire propagates upward with random decay.
+# The reply is a delta against the previous frame: runs of changed rows, each as
+# offset(u16) length(u16) followed by the new bytes (see apply_delta).
 FIRE_SCRIPT = """
 local key = KEYS[1]
 local W = tonumber(ARGV[1])
 local H = tonumber(ARGV[2])
+local rng = tonumber(ARGV[3]) or 2463534242
 local N = W * H
-
-local raw = redis.call('GET', key)
+local CHUNK = 4096
+local unpack = table.unpack or unpack
+local byte, char, sub, rep, concat = string.byte, string.char, string.sub, string.rep, table.concat
+local min = math.min
+local band, bxor, lshift, rshift = bit.band, bit.bxor, bit.lshift, bit.rshift
+local call = redis.call
+
+local raw = call('GET', key)
 local px = {}
 
 if not raw or #raw ~= N then
+    raw = rep(char(0), N)
     for i = 1, N do px[i] = 0 end
     for x = 1, W do px[(H - 1) * W + x] = 36 end
 else
-    for i = 1, N do px[i] = string.byte(raw, i) end
+    -- Bulk-unpack in slices: Lua caps how many values one C call can return
+    for off = 0, N - 1, CHUNK do
+        local b = {byte(raw, off + 1, min(off + CHUNK, N))}
+        for i = 1, #b do px[off + i] = b[i] end
+    end
 end
 
-for x = 1, W do
-    for y = 2, H do
-        local src = (y - 1) * W + x
-        local p = px[src]
-        if p == 0 then
-            px[src - W] = 0
-        else
-            local r = math.random(0, 3)
-            local nx = math.max(1, math.min(W, x - r + 1))
-            local dst = (y - 2) * W + nx
-            local v = p - (r % 2)
-            if v < 0 then v = 0 end
-            px[dst] = v
+-- Single pass over every pixel below the top row: each one feeds the row above,
+-- drifting up to one column right or two columns left.
+-- Randomness: xorshift32 seeded by the client, each draw split into 16 2-bit values.
+local bits, left = 0, 0
+for src = W + 1, N do
+    local p = px[src]
+    if p == 0 then
+        px[src - W] = 0
+    else
+        if left == 0 then
+            rng = bxor(rng, lshift(rng, 13))
+            rng = bxor(rng, rshift(rng, 17))
+            rng = bxor(rng, lshift(rng, 5))
+            bits, left = rng, 16
         end
+        local r = bits % 4
+        bits, left = rshift(bits, 2), left - 1
+        local col = (src - 1) % W
+        local nx = col - r + 1
+        if nx < 0 then nx = 0 elseif nx >= W then nx = W - 1 end
+        px[src - W - col + nx] = p - band(r, 1)
     end
 end
 
-local t = {}
-for i = 1, N do t[i] = string.char(px[i]) end
-local s = table.concat(t)
-redis.call('SET', key, s)
-return s
+-- Pack row by row: the same row strings make up both the stored grid and the
+-- runs of changed rows sent back
+local rows, d = {}, {}
+local first
+for y = 1, H + 1 do
+    local changed = false
+    if y <= H then
+        local off = (y - 1) * W
+        rows[y] = char(unpack(px, off + 1, off + W))
+        changed = rows[y] ~= sub(raw, off + 1, off + W)
+    end
+    if changed then
+        first = first or y
+    elseif first then
+        local off, len = (first - 1) * W, (y - first) * W
+        d[#d + 1] = char(rshift(off, 8), band(off, 0xFF), rshift(len, 8), band(len, 0xFF))
+        d[#d + 1] = concat(rows, '', first, y - 1)
+        first = nil
+    end
+end
+call('SET', key, concat(rows))
+return concat(d)
 """
 
 KEY = "doom:fire"
 
 
+def apply_delta(frame, delta):
+    """Patch frame in place with the changed runs returned by FIRE_SCRIPT."""
+    view = memoryview(delta)
+    pos = 0
+    while pos < len(delta):
+        off, n = struct.unpack_from(">HH", delta, pos)
+        pos += 4
+        frame[off : off + n] = view[pos : pos + n]
+        pos += n
+
+
 def render(data, w, h):
-    buf = []
-    for y in range(h):
-        for x in range(w):
-            intensity = data[y * w + x]
-            if intensity >= len(PALETTE):
-                intensity = len(PALETTE) - 1
-            r, g, b = PALETTE[intensity]
-            buf.append(f"\033[48;2;{r};{g};{b}m ")
-        buf.append("\033[0m\n")
-    return "".join(buf)
+    view = memoryview(data)  # row slices without copying
+    return b"".join(
+        b"".join(map(CELL.__getitem__, view[y * w : (y + 1) * w])) + b"\033[0m\n" for y in range(h)
+    )
 
 
 def main():
@@ -123,6 +173,8 @@ def main():
 
     r = redis.Redis(host=host, port=port)
     r.ping()
+    # SCRIPT LOAD once, then EVALSHA each frame (reloaded automatically after SCRIPT FLUSH)
+    fire = r.register_script(FIRE_SCRIPT)
 
     try:
         cols, rows = os.get_terminal_size()
@@ -134,12 +186,16 @@ def main():
 
     r.delete(KEY)
     print("\033[2J\033[H\033[?25l", end="")  # clear screen, hide cursor
-    print(f" DOOM FIRE x DRAGONFLY  --  {w}x{h} pixels computed inside the database")
+    print(f" DOOM FIRE x DRAGONFLY  --  {w}x{h} pixels computed inside the database", flush=True)
 
+    # Frames are already bytes: write them straight to the binary stdout buffer
+    out = sys.stdout.buffer
+    frame = bytearray(w * h)
     try:
         while True:
-            data = r.eval(FIRE_SCRIPT, 1, KEY, w, h)
-            print(f"\033[2;1H{render(data, w, h)}", end="", flush=True)
+            apply_delta(frame, fire(keys=[KEY], args=[w, h, random.randrange(1, 1 << 32)]))
+            out.write(b"\033[2;1H" + render(frame, w, h))
+            out.flush()
             time.sleep(1 / 30)
     except KeyboardInterrupt:
         pass
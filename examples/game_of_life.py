@@ -3,10 +3,10 @@
 Conway's Game of Life — running inside Dragonfly via Lua scripting.
 
 The entire simulation (birth, death, survival) runs as a Lua script inside Dragonfly.
-This client just sends EVAL and renders the result. The database IS the universe.
+This client just sends EVALSHA and renders the result. The database IS the universe.
 
 Usage:
-    pip install redis
+    pip install "redis[hiredis]"
     # Start Dragonfly first, then:
     python3 examples/game_of_life.py
 """
@@ -18,64 +18,154 @@ import time
 import redis
 
 # All simulation logic runs inside Dragonfly as a Lua script.
-# The grid is a binary string: each byte is 0 (dead) or 1 (alive).
+# The grid is a binary string of bit-packed rows: each row is ceil(W/32)
+# little-endian 32-bit words, bit x of a row is the cell in column x.
 # Rules: alive cell with 2-3 neighbors survives, dead cell with 3 neighbors is born.
+# The next generation is computed 32 cells at a time: each row is shifted
+# left/right (with wrap-around) and the eight neighbor bit-planes are summed
+# with bitwise full adders into a 4-bit count per cell.
 LIFE_SCRIPT = """
 local key = KEYS[1]
 local W = tonumber(ARGV[1])
 local H = tonumber(ARGV[2])
-local N = W * H
+local NW = math.ceil(W / 32)
+local STRIDE = NW * 4
 
-local raw = redis.call('GET', key)
+local band, bor, bxor, bnot = bit.band, bit.bor, bit.bxor, bit.bnot
+local lshift, rshift = bit.lshift, bit.rshift
+local unpack = table.unpack or unpack
+local byte, char, rep, concat = string.byte, string.char, string.rep, table.concat
+local random = math.random
+local call = redis.call
+
+-- Bit of the last column inside the last word of a row; bits above it stay clear
+local TAIL = (W - 1) % 32
+local LAST_MASK = rshift(-1, 31 - TAIL)
+
+local raw = call('GET', key)
 local cur = {}
 
-if not raw or #raw ~= N then
-    -- Seed with random ~25% density
-    for i = 1, N do
-        if math.random(1, 4) == 1 then
-            cur[i] = 1
-        else
-            cur[i] = 0
+if not raw or #raw ~= H * STRIDE then
+    -- Seed with random ~25% density: AND of two random words
+    for y = 1, H do
+        local row = {}
+        for k = 1, NW do
+            local a = random(0, 0xFFFF) * 0x10000 + random(0, 0xFFFF)
+            local b = random(0, 0xFFFF) * 0x10000 + random(0, 0xFFFF)
+            row[k] = band(a, b)
         end
+        row[NW] = band(row[NW], LAST_MASK)
+        cur[y] = row
     end
 else
-    for i = 1, N do cur[i] = string.byte(raw, i) end
+    for y = 1, H do
+        local b = {byte(raw, (y - 1) * STRIDE + 1, y * STRIDE)}
+        local row = {}
+        for k = 1, NW do
+            local i = k * 4
+            row[k] = bor(b[i - 3], lshift(b[i - 2], 8), lshift(b[i - 1], 16), lshift(b[i], 24))
+        end
+        cur[y] = row
+    end
 end
 
--- Compute next generation
-local nxt = {}
-for y = 0, H - 1 do
-    for x = 0, W - 1 do
-        local neighbors = 0
-        for dy = -1, 1 do
-            for dx = -1, 1 do
-                if not (dx == 0 and dy == 0) then
-                    local nx = (x + dx) % W
-                    local ny = (y + dy) % H
-                    neighbors = neighbors + cur[ny * W + nx + 1]
-                end
-            end
-        end
-        local idx = y * W + x + 1
-        local alive = cur[idx]
-        if alive == 1 and (neighbors == 2 or neighbors == 3) then
-            nxt[idx] = 1
-        elseif alive == 0 and neighbors == 3 then
-            nxt[idx] = 1
-        else
-            nxt[idx] = 0
-        end
+-- West (L) and east (R) neighbor planes of a row: bit x holds cell x-1 / x+1
+local function shifted(row)
+    local L, R = {}, {}
+    local last = band(rshift(row[NW], TAIL), 1)
+    local first = band(row[1], 1)
+    for k = 1, NW do
+        local w = row[k]
+        local carry_in = k > 1 and rshift(row[k - 1], 31) or last
+        local carry_out = k < NW and lshift(row[k + 1], 31) or 0
+        L[k] = bor(lshift(w, 1), carry_in)
+        R[k] = bor(rshift(w, 1), carry_out)
     end
+    L[NW] = band(L[NW], LAST_MASK)
+    R[NW] = bor(R[NW], lshift(first, TAIL))
+    return L, R
 end
 
-local t = {}
-for i = 1, N do t[i] = string.char(nxt[i]) end
-local s = table.concat(t)
-redis.call('SET', key, s)
+-- Shift every row once; each one is a neighbor of the rows above and below it.
+-- Empty rows share one all-zero plane and are remembered so quiet bands are skipped.
+local ZERO = {}
+for k = 1, NW do ZERO[k] = 0 end
+local ZERO_ROW = rep(char(0), STRIDE)
+local west, east, live = {}, {}, {}
+for y = 1, H do
+    live[y] = bor(unpack(cur[y], 1, NW)) ~= 0
+    if live[y] then
+        west[y], east[y] = shifted(cur[y])
+    else
+        west[y], east[y] = ZERO, ZERO
+    end
+end
 
--- Count alive cells
+-- Compute next generation, packing each row and counting alive cells as it goes
+local t, packed = {}, {}
 local pop = 0
-for i = 1, N do pop = pop + nxt[i] end
+for y = 1, H do
+    local ym, yp = (y - 2) % H + 1, y % H + 1
+    if not (live[ym] or live[y] or live[yp]) then
+        t[y] = ZERO_ROW
+    else
+        local up, row, dn = cur[ym], cur[y], cur[yp]
+        local uL, uR = west[ym], east[ym]
+        local cL, cR = west[y], east[y]
+        local dL, dR = west[yp], east[yp]
+        for k = 1, NW do
+            local w = 0
+            -- Quiet word: with no live neighbors nothing is born and nothing survives
+            if bor(uL[k], up[k], uR[k], cL[k], cR[k], dL[k], dn[k], dR[k]) ~= 0 then
+                -- Row above and row below: full adders -> 2-bit sums
+                local a, b, c = uL[k], up[k], uR[k]
+                local a0 = bxor(a, b, c)
+                local a1 = bor(band(a, b), band(c, bxor(a, b)))
+                a, b, c = dL[k], dn[k], dR[k]
+                local b0 = bxor(a, b, c)
+                local b1 = bor(band(a, b), band(c, bxor(a, b)))
+                -- Same row: half adder
+                a, b = cL[k], cR[k]
+                local c0 = bxor(a, b)
+                local c1 = band(a, b)
+                -- Ones
+                local s0 = bxor(a0, b0, c0)
+                local k1 = bor(band(a0, b0), band(c0, bxor(a0, b0)))
+                -- Twos: a1 + b1 + c1 + k1
+                local u0 = bxor(a1, b1, c1)
+                local u1 = bor(band(a1, b1), band(c1, bxor(a1, b1)))
+                local s1 = bxor(u0, k1)
+                local c2 = band(u0, k1)
+                -- Fours and eights
+                local s2 = bxor(u1, c2)
+                local s3 = band(u1, c2)
+                -- Alive next: count == 3, or count == 2 and alive now
+                w = band(s1, bnot(bor(s2, s3)), bor(s0, row[k]))
+                if k == NW then w = band(w, LAST_MASK) end
+            end
+
+            local i = k * 4
+            if w == 0 then
+                packed[i - 3], packed[i - 2], packed[i - 1], packed[i] = 0, 0, 0, 0
+            else
+                packed[i - 3] = band(w, 0xFF)
+                packed[i - 2] = band(rshift(w, 8), 0xFF)
+                packed[i - 1] = band(rshift(w, 16), 0xFF)
+                packed[i] = rshift(w, 24)
+
+                -- Population count of the word
+                w = w - band(rshift(w, 1), 0x55555555)
+                w = band(w, 0x33333333) + band(rshift(w, 2), 0x33333333)
+                w = band(w + rshift(w, 4), 0x0F0F0F0F)
+                pop = pop + band(w + rshift(w, 8) + rshift(w, 16) + rshift(w, 24), 0x3F)
+            end
+        end
+        t[y] = char(unpack(packed, 1, STRIDE))
+    end
+end
+
+local s = concat(t)
+call('SET', key, s)
 
 return {s, pop}
 """
@@ -101,22 +191,46 @@ BRAILLE_MAP = {
     (1, 3): 0x80,
 }
 
+# UTF-8 encoded braille character for every 8-bit dot pattern
+BRAILLE_UTF8 = tuple(chr(BRAILLE_BASE + code).encode() for code in range(256))
+
+# BRAILLE_DOTS[dy][k] is a bytes.translate table: it maps a packed row byte
+# (8 cells, lowest bit first) at row dy of a character to the dots of its k-th
+# pair of columns.
+BRAILLE_DOTS = [
+    [
+        bytes(
+            (BRAILLE_MAP[(0, dy)] if v >> (2 * k) & 1 else 0)
+            | (BRAILLE_MAP[(1, dy)] if v >> (2 * k + 1) & 1 else 0)
+            for v in range(256)
+        )
+        for k in range(4)
+    ]
+    for dy in range(4)
+]
+
 
 def render_braille(data, w, h):
-    """Render grid using braille characters — 2x4 cells per character."""
+    """Render grid as UTF-8 braille characters — 2x4 cells per character.
+
+    Works on one band of 4 rows at a time: every packed row byte is spread into
+    the dots of its 4 column pairs with bytes.translate, and the rows of the band
+    are OR-ed together as one big integer, so no Python loop runs per cell.
+    """
+    stride = (w + 31) // 32 * 4  # bytes per bit-packed row
+    chars = (w + 1) // 2
+    dots = bytearray(stride * 4)
     lines = []
     for cy in range(0, h, 4):
-        row = []
-        for cx in range(0, w, 2):
-            code = BRAILLE_BASE
-            for dx in range(2):
-                for dy in range(4):
-                    x, y = cx + dx, cy + dy
-                    if x < w and y < h and data[y * w + x]:
-                        code |= BRAILLE_MAP[(dx, dy)]
-            row.append(chr(code))
-        lines.append("".join(row))
-    return "\n".join(lines)
+        code = 0
+        for dy in range(min(4, h - cy)):
+            row = data[(cy + dy) * stride : (cy + dy + 1) * stride]
+            for k, table in enumerate(BRAILLE_DOTS[dy]):
+                dots[k::4] = row.translate(table)
+            code |= int.from_bytes(dots, "little")
+        cells = code.to_bytes(len(dots), "little")[:chars]
+        lines.append(b"".join(map(BRAILLE_UTF8.__getitem__, cells)))
+    return b"\n".join(lines)
 
 
 def main():
@@ -125,6 +239,7 @@ def main():
 
     r = redis.Redis(host=host, port=port)
     r.ping()
+    life = r.register_script(LIFE_SCRIPT)
 
     try:
         cols, rows = os.get_terminal_size()
@@ -136,17 +251,19 @@ def main():
     h = min((rows - 3) * 4, 160)
 
     r.delete(KEY)
-    print("\033[2J\033[H\033[?25l", end="")  # clear screen, hide cursor
+    print("\033[2J\033[H\033[?25l", end="", flush=True)  # clear screen, hide cursor
 
+    out = sys.stdout.buffer
     gen = 0
     try:
         while True:
-            result = r.eval(LIFE_SCRIPT, 1, KEY, w, h)
+            result = life(keys=[KEY], args=[w, h])
             data, pop = result[0], int(result[1])
             gen += 1
             frame = render_braille(data, w, h)
             status = f" GAME OF LIFE x DRAGONFLY  |  gen {gen}  |  {pop} alive  |  {w}x{h} universe"
-            print(f"\033[1;1H\033[K{status}\n{frame}", end="", flush=True)
+            out.write(f"\033[1;1H\033[K{status}\n".encode() + frame)
+            out.flush()
             time.sleep(1 / 15)
     except KeyboardInterrupt:
         pass
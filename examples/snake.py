@@ -2,11 +2,11 @@
 """
 Multiplayer Snake — running inside Dragonfly.
 
-All game logic (movement, collision, food) runs as a single Lua EVAL.
+All game logic (movement, collision, food) runs as a single Lua EVALSHA.
 Multiple players connect from separate terminals. Dragonfly IS the game server.
 
 Usage:
-    pip install redis
+    pip install "redis[hiredis]"
     # Terminal 1:
     python3 examples/snake.py alice
     # Terminal 2:
@@ -16,8 +16,9 @@ Controls: Arrow keys / WASD to move, Q to quit, R to respawn when dead.
 """
 
 import curses
-import json
 import os
+import random
+import struct
 import sys
 
 import redis
@@ -25,7 +26,15 @@ import redis
 # One game tick — ALL logic runs inside Dragonfly.
 # Only 2 declared KEYS: game state + tick lock. Player data arrives via ARGV.
 # KEYS: [1]=game state, [2]=tick lock
-# ARGV: [1]=tick_ms, [2]=board_w, [3]=board_h, [4]=player_name, [5]=direction, [6]=respawn
+# ARGV: [1]=tick_ms, [2]=board_w, [3]=board_h, [4]=player_name, [5]=direction, [6]=respawn,
+#       [7]=random seed
+#
+# The game state is a packed big-endian binary string (see parse_state):
+#   header: tick(u32) food_x(u8) food_y(u8) player_count(u8)
+#   player: name_len(u8) name dir(u8) alive(u8) score(u16) last_seen(u32)
+#           body_len(u16) then body_len (x(u8), y(u8)) segments, head first
+# so names are capped at 255 bytes (see main) and a game at 255 players; anyone
+# joining a full game just watches.
 TICK_SCRIPT = """
 local game_key = KEYS[1]
 local tick_lock = KEYS[2]
@@ -36,13 +45,77 @@ local H = tonumber(ARGV[3])
 local pname = ARGV[4]
 local pdir = ARGV[5]
 local respawn = ARGV[6]
+local rng = tonumber(ARGV[7]) or 2463534242
+
+local byte, char, sub = string.byte, string.char, string.sub
+local insert, concat = table.insert, table.concat
+local floor = math.floor
+local bxor, lshift, rshift = bit.bxor, bit.lshift, bit.rshift
+local call = redis.call
+
+-- xorshift32 seeded by the client; returns an integer in [lo, hi]
+local function random(lo, hi)
+    rng = bxor(rng, lshift(rng, 13))
+    rng = bxor(rng, rshift(rng, 17))
+    rng = bxor(rng, lshift(rng, 5))
+    return lo + rng % (hi - lo + 1)
+end
+
+local DIRS = {'UP', 'DOWN', 'LEFT', 'RIGHT'}
+local DIR_CODE = {UP=1, DOWN=2, LEFT=3, RIGHT=4}
+
+local function u16(s, i)
+    local a, b = byte(s, i, i + 1)
+    return a * 256 + b
+end
+
+local function u32(s, i)
+    local a, b, c, d = byte(s, i, i + 3)
+    return ((a * 256 + b) * 256 + c) * 256 + d
+end
+
+local function pack16(v)
+    return char(floor(v / 256) % 256, v % 256)
+end
+
+local function pack32(v)
+    return pack16(floor(v / 65536) % 65536) .. pack16(v % 65536)
+end
 
-local raw = redis.call('GET', game_key)
+-- Snake bodies are ring buffers: p.len segments in p.cap slots of p.bx/p.by,
+-- the head at slot p.head and every older segment in the slot before it.
+-- Moving writes one new head slot instead of shifting the whole body.
+local function reset_body(p, sx, sy)
+    p.bx, p.by = {sx - 2, sx - 1, sx}, {sy, sy, sy}
+    p.head, p.len, p.cap = 3, 3, 4
+end
+
+local raw = call('GET', game_key)
 local state
 if raw then
-    state = cjson.decode(raw)
+    state = {tick=u32(raw, 1), food={x=byte(raw, 5), y=byte(raw, 6)}, players={}}
+    local pos = 8
+    for i = 1, byte(raw, 7) do
+        local nlen = byte(raw, pos)
+        local p = {name=sub(raw, pos + 1, pos + nlen)}
+        pos = pos + nlen + 1
+        p.dir = DIRS[byte(raw, pos)]
+        p.alive = byte(raw, pos + 1) == 1
+        p.score = u16(raw, pos + 2)
+        p.last_seen = u32(raw, pos + 4)
+        -- Stored head first; leave one free slot so the snake can grow this tick
+        local n = u16(raw, pos + 8)
+        local bx, by = {}, {}
+        for k = 1, n do
+            local at = pos + 8 + k * 2
+            bx[n - k + 1], by[n - k + 1] = byte(raw, at, at + 1)
+        end
+        p.bx, p.by, p.head, p.len, p.cap = bx, by, n, n, n + 1
+        pos = pos + 10 + n * 2
+        state.players[i] = p
+    end
 else
-    state = {w=W, h=H, food={x=math.random(1,W-2), y=math.random(1,H-2)}, players={}, tick=0}
+    state = {w=W, h=H, food={x=random(1,W-2), y=random(1,H-2)}, players={}, tick=0}
 end
 
 -- Update this player's info (direction, last_seen, respawn)
@@ -55,35 +128,29 @@ for _, p in ipairs(state.players) do
             local opp = {UP='DOWN', DOWN='UP', LEFT='RIGHT', RIGHT='LEFT'}
             if opp[pdir] ~= p.dir then p.dir = pdir end
         elseif respawn == '1' then
-            local sx = math.random(3, W - 3)
-            local sy = math.random(3, H - 3)
-            p.body = {{x=sx,y=sy},{x=sx-1,y=sy},{x=sx-2,y=sy}}
+            reset_body(p, random(3, W - 3), random(3, H - 3))
             p.dir = 'RIGHT'
             p.alive = true
         end
         break
     end
 end
-if not found then
-    local sx = math.random(3, W - 3)
-    local sy = math.random(3, H - 3)
-    table.insert(state.players, {
-        name=pname,
-        body={{x=sx,y=sy},{x=sx-1,y=sy},{x=sx-2,y=sy}},
-        dir=pdir, score=0, alive=true, last_seen=state.tick
-    })
+if not found and #state.players < 255 then
+    local p = {name=pname, dir=pdir, score=0, alive=true, last_seen=state.tick}
+    reset_body(p, random(3, W - 3), random(3, H - 3))
+    insert(state.players, p)
 end
 
 -- Check tick lock — only advance simulation once per interval
-local should_tick = redis.call('EXISTS', tick_lock) == 0
+local should_tick = call('EXISTS', tick_lock) == 0
 if should_tick then
-    redis.call('SET', tick_lock, '1', 'PX', tick_ms)
+    call('SET', tick_lock, '1', 'PX', tick_ms)
 
     -- Prune disconnected players (not seen for 50+ ticks)
     local keep = {}
     for _, p in ipairs(state.players) do
         if state.tick - (p.last_seen or 0) < 50 then
-            table.insert(keep, p)
+            insert(keep, p)
         end
     end
     state.players = keep
@@ -91,8 +158,7 @@ if should_tick then
     -- Move alive snakes
     for _, p in ipairs(state.players) do
         if p.alive then
-            local hd = p.body[1]
-            local nx, ny = hd.x, hd.y
+            local nx, ny = p.bx[p.head], p.by[p.head]
             if p.dir == 'UP' then ny = ny - 1
             elseif p.dir == 'DOWN' then ny = ny + 1
             elseif p.dir == 'LEFT' then nx = nx - 1
@@ -101,8 +167,10 @@ if should_tick then
             if nx < 0 or nx >= W or ny < 0 or ny >= H then
                 p.alive = false
             else
-                for k = 1, #p.body - 1 do
-                    if p.body[k].x == nx and p.body[k].y == ny then
+                -- Every segment but the tail, which moves out of the way
+                for k = 0, p.len - 2 do
+                    local s = (p.head - k - 1) % p.cap + 1
+                    if p.bx[s] == nx and p.by[s] == ny then
                         p.alive = false
                         break
                     end
@@ -110,30 +178,35 @@ if should_tick then
             end
 
             if p.alive then
-                table.insert(p.body, 1, {x=nx, y=ny})
+                p.head = p.head % p.cap + 1
+                p.bx[p.head], p.by[p.head] = nx, ny
                 if nx == state.food.x and ny == state.food.y then
+                    p.len = p.len + 1
                     p.score = p.score + 1
-                    state.food = {x=math.random(1,W-2), y=math.random(1,H-2)}
-                else
-                    table.remove(p.body)
+                    state.food = {x=random(1,W-2), y=random(1,H-2)}
                 end
             end
         end
     end
 
-    -- Cross-snake collision
-    for i, p1 in ipairs(state.players) do
-        if p1.alive then
-            for j, p2 in ipairs(state.players) do
-                if i ~= j then
-                    local hd = p1.body[1]
-                    for _, seg in ipairs(p2.body) do
-                        if hd.x == seg.x and hd.y == seg.y then
-                            p1.alive = false
-                            if p2.alive then p2.score = p2.score + 1 end
-                            break
-                        end
-                    end
+    -- Cross-snake collision: map every occupied cell to the snakes on it, then
+    -- every other snake under a live head kills it and scores if still alive
+    local occ = {}
+    for i, p in ipairs(state.players) do
+        for k = 0, p.len - 1 do
+            local s = (p.head - k - 1) % p.cap + 1
+            local c = p.by[s] * W + p.bx[s]
+            local o = occ[c]
+            if not o then occ[c] = {i} elseif o[#o] ~= i then insert(o, i) end
+        end
+    end
+    for i, p in ipairs(state.players) do
+        if p.alive then
+            for _, j in ipairs(occ[p.by[p.head] * W + p.bx[p.head]]) do
+                if j ~= i then
+                    p.alive = false
+                    local q = state.players[j]
+                    if q.alive then q.score = q.score + 1 end
                 end
             end
         end
@@ -142,11 +215,38 @@ if should_tick then
     state.tick = state.tick + 1
 end
 
-local enc = cjson.encode(state)
-redis.call('SET', game_key, enc)
+local out = {pack32(state.tick), char(state.food.x, state.food.y, #state.players)}
+for _, p in ipairs(state.players) do
+    out[#out + 1] = char(#p.name) .. p.name
+    out[#out + 1] = char(DIR_CODE[p.dir], p.alive and 1 or 0)
+    out[#out + 1] = pack16(p.score) .. pack32(p.last_seen) .. pack16(p.len)
+    for k = 0, p.len - 1 do
+        local s = (p.head - k - 1) % p.cap + 1
+        out[#out + 1] = char(p.bx[s], p.by[s])
+    end
+end
+local enc = concat(out)
+call('SET', game_key, enc)
 return enc
 """
 
+# Leave the game in one round trip: if nobody else is playing, drop the game.
+# KEYS: [1]=game state, [2]=tick lock
+# ARGV: [1]=player_name
+LEAVE_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then return 0 end
+local pos = 8
+for _ = 1, string.byte(raw, 7) do
+    local nlen = string.byte(raw, pos)
+    if string.sub(raw, pos + 1, pos + nlen) ~= ARGV[1] then return 0 end
+    local a, b = string.byte(raw, pos + nlen + 9, pos + nlen + 10)
+    pos = pos + nlen + 11 + (a * 256 + b) * 2
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
 GAME_KEY = "snake:game"
 TICK_KEY = "snake:tick"
 
@@ -171,6 +271,23 @@ PLAYER_COLORS = [
 ]
 
 
+def parse_state(raw):
+    """Decode the packed game state returned by TICK_SCRIPT."""
+    tick, fx, fy, count = struct.unpack_from(">IBBB", raw)
+    pos = 7
+    players = []
+    for _ in range(count):
+        n = raw[pos]
+        name = raw[pos + 1 : pos + 1 + n].decode(errors="replace")
+        pos += 1 + n
+        _, alive, score, _, blen = struct.unpack_from(">BBHIH", raw, pos)
+        pos += 10
+        body = raw[pos : pos + 2 * blen]  # flat x0 y0 x1 y1 ..., head first
+        pos += 2 * blen
+        players.append({"name": name, "alive": bool(alive), "score": score, "body": body})
+    return {"tick": tick, "food": (fx, fy), "players": players}
+
+
 def safe_addstr(win, y, x, s, attr=0):
     h, w = win.getmaxyx()
     if y < 0 or y >= h or x >= w:
@@ -200,8 +317,9 @@ def run(stdscr, name, host, port):
         curses.init_pair(i + 1, c, -1)
     curses.init_pair(len(PLAYER_COLORS) + 1, curses.COLOR_RED, curses.COLOR_RED)
 
-    r = redis.Redis(host=host, port=port)
+    r = redis.Redis(host=host, port=port, socket_keepalive=True)
     r.ping()
+    tick = r.register_script(TICK_SCRIPT)
 
     rows, cols = stdscr.getmaxyx()
     bw = min(cols - 2, 60)
@@ -221,15 +339,17 @@ def run(stdscr, name, host, port):
             if key == ord("r"):
                 want_respawn = "1"
 
-            raw = r.eval(
-                TICK_SCRIPT, 2, GAME_KEY, TICK_KEY, tick_ms, bw, bh, name, direction, want_respawn
+            seed = random.randrange(1, 1 << 32)
+            raw = tick(
+                keys=[GAME_KEY, TICK_KEY],
+                args=[tick_ms, bw, bh, name, direction, want_respawn, seed],
             )
             want_respawn = "0"
 
             if not raw:
                 continue
 
-            state = json.loads(raw)
+            state = parse_state(raw)
             stdscr.erase()
 
             # Title
@@ -250,7 +370,7 @@ def run(stdscr, name, host, port):
                 safe_addch(stdscr, y, bw + 1, curses.ACS_VLINE)
 
             # Food
-            fx, fy = int(state["food"]["x"]), int(state["food"]["y"])
+            fx, fy = state["food"]
             safe_addch(
                 stdscr,
                 fy + 2,
@@ -269,14 +389,16 @@ def run(stdscr, name, host, port):
                 )
                 scores.append(f"{p['name']}: {p['score']}{tag}{dead}")
 
-                for j, seg in enumerate(p.get("body", [])):
-                    sx, sy = int(seg["x"]), int(seg["y"])
-                    ch = "@" if j == 0 else "o"
-                    attr = color | curses.A_BOLD
-                    if not p["alive"]:
-                        attr = curses.A_DIM
-                        ch = "x" if j == 0 else "."
-                    safe_addch(stdscr, sy + 2, sx + 1, ord(ch), attr)
+                body = p["body"]
+                if not body:
+                    continue
+                if p["alive"]:
+                    head_ch, seg_ch, attr = ord("@"), ord("o"), color | curses.A_BOLD
+                else:
+                    head_ch, seg_ch, attr = ord("x"), ord("."), curses.A_DIM
+                safe_addch(stdscr, body[1] + 2, body[0] + 1, head_ch, attr)
+                for sx, sy in zip(body[2::2], body[3::2]):
+                    safe_addch(stdscr, sy + 2, sx + 1, seg_ch, attr)
 
             # Scoreboard
             safe_addstr(stdscr, bh + 3, 0, "  |  ".join(scores))
@@ -286,12 +408,8 @@ def run(stdscr, name, host, port):
     finally:
         # Mark player as gone by not sending updates; pruning will remove them.
         # If we're the only player, clean up immediately.
-        raw = r.get(GAME_KEY)
-        if raw:
-            state = json.loads(raw)
-            remaining = [p for p in state.get("players", []) if p["name"] != name]
-            if not remaining:
-                r.delete(GAME_KEY, TICK_KEY)
+        # Plain EVAL: it runs once, so EVALSHA would only add a NOSCRIPT round trip.
+        r.eval(LEAVE_SCRIPT, 2, GAME_KEY, TICK_KEY, name)
 
 
 def main():
@@ -306,6 +424,7 @@ def main():
             host = a
         else:
             name = a
+    name = name.encode()[:255].decode(errors="ignore")
 
     curses.wrapper(lambda stdscr: run(stdscr, name, host, port))
 